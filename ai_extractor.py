@@ -1,57 +1,59 @@
-import openai
+import aiohttp
 import asyncio
+import hashlib
 import json
-import re
+import random
 import os
-from typing import Dict, Any, Optional
+import time
+from aiolimiter import AsyncLimiter
+from collections import OrderedDict
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from datetime import datetime
 import logging
 
+from semantic_cache import SemanticCache
+
 logger = logging.getLogger(__name__)
 
-class AIExtractor:
-    def __init__(self):
-        self.client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-    def health_check(self) -> bool:
-        """Check if AI service is available"""
-        try:
-            return bool(os.getenv("OPENAI_API_KEY"))
-        except:
-            return False
-    
-    async def extract_rfq_content(self, document_content: str, options: Dict[str, Any] = {}) -> Dict[str, Any]:
-        """Extract structured content from RFQ document using AI"""
-        try:
-            prompt = self._build_extraction_prompt(document_content, options)
-            
-            response = await self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": "You are an expert at analyzing government RFQ documents and extracting key information."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=4000
-            )
-            
-            extracted_text = response.choices[0].message.content
-            extracted_content = self._parse_extraction_response(extracted_text)
-            
-            logger.info("AI extraction completed successfully")
-            return extracted_content
-            
-        except Exception as e:
-            logger.error(f"AI extraction failed: {str(e)}")
-            raise Exception(f"AI extraction failed: {str(e)}")
-    
-    def _build_extraction_prompt(self, content: str, options: Dict[str, Any]) -> str:
-        """Build the prompt for AI extraction"""
-        return f"""
-Analyze this government RFQ document and extract the following information in JSON format:
+OPENAI_CHAT_COMPLETIONS_URL = "https://api.openai.com/v1/chat/completions"
+OPENAI_MODELS_URL = "https://api.openai.com/v1/models"
+MAX_CONNECTIONS = 200
+KEEPALIVE_TIMEOUT = 60
+CONNECT_TIMEOUT = 10
+REQUEST_TIMEOUT = 60
+MIN_TOKENS_PER_SECOND = 20
+TIMEOUT_RETRY_MAX_TOKENS = 1200
+EXTRACTION_MODEL = "gpt-4-turbo-preview"
+MAX_OUTPUT_TOKENS = 4096
+SECTION_MAX_TOKENS = 400
+LONG_SECTION_MAX_TOKENS = 1200
+BATCH_TOKENS_PER_DOCUMENT = 2000
+DEFAULT_BATCH_SIZE = MAX_OUTPUT_TOKENS // BATCH_TOKENS_PER_DOCUMENT
+MAX_ATTEMPTS = 3
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+EXTRACTION_SECTIONS = [
+    "project_overview",
+    "scope_of_work",
+    "deliverables",
+    "timeline",
+    "location",
+    "submission_requirements",
+    "technical_requirements",
+    "qualifications",
+    "evaluation_criteria"
+]
 
-DOCUMENT CONTENT:
-{content}
+LONG_SECTIONS = {"scope_of_work", "technical_requirements", "submission_requirements"}
+
+_SECTION_TOKEN_BUDGETS = {
+    section: LONG_SECTION_MAX_TOKENS if section in LONG_SECTIONS else SECTION_MAX_TOKENS
+    for section in EXTRACTION_SECTIONS
+}
+
+_EXTRACTION_INSTRUCTIONS = """You are an expert at analyzing government RFQ documents and extracting key information. Respond with JSON only.
+
+Analyze the government RFQ document provided by the user and extract the following information in JSON format.
 
 Please extract and structure the following sections:
 
@@ -71,9 +73,11 @@ IMPORTANT RULES:
 - Extract actual requirements, not procedural language
 - If a section is not clearly present, mark it as "Not specified"
 - Provide clean, business-focused content suitable for vendor consumption
+"""
 
+_SYSTEM_PROMPT = _EXTRACTION_INSTRUCTIONS + """
 Return the response in this JSON format:
-{{
+{
     "project_overview": "...",
     "scope_of_work": "...",
     "deliverables": "...",
@@ -85,35 +89,336 @@ Return the response in this JSON format:
     "evaluation_criteria": "...",
     "extracted_sections": ["list of sections found"],
     "confidence_score": 0.95
-}}
+}
 """
+
+_BATCH_SYSTEM_PROMPT = _SYSTEM_PROMPT + """
+The user message contains several documents labelled DOC_1, DOC_2, and so on, separated by "---".
+Extract each document independently and return a single JSON object in this format:
+{"results": [<DOC_1 object>, <DOC_2 object>, ...]}
+Each entry must use the JSON format above, and the entries must be in the same order as the documents.
+"""
+
+_SECTION_SYSTEM_PROMPT = _EXTRACTION_INSTRUCTIONS + """
+Each request names a single section. Return only that section in the JSON format given with the request.
+"""
+
+_PROMPT_PREFIX = "DOCUMENT CONTENT:\n"
+
+_SECTION_PROMPTS = {
+    section: f"""Extract only the {section.upper()} section from the document above.
+Summarize it in at most {_SECTION_TOKEN_BUDGETS[section] // 2} words so the reply stays within {_SECTION_TOKEN_BUDGETS[section]} tokens.
+Return the response in this JSON format:
+{{"{section}": "...", "confidence_score": 0.95}}"""
+    for section in EXTRACTION_SECTIONS
+}
+
+class AIExtractor:
+    def __init__(self, cache_ttl: float = 1800, cache_max_entries: int = 256, requests_per_minute: int = 500):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._limiter = AsyncLimiter(requests_per_minute, 60)
+        self._resp_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._cache_ttl = cache_ttl
+        self._cache_max_entries = cache_max_entries
+        self._cache_lock = asyncio.Lock()
+        self._semantic_cache = SemanticCache(
+            db_path=os.getenv("SEMANTIC_CACHE_PATH"),
+            enabled=os.getenv("SEMANTIC_CACHE_ENABLED", "").lower() in ("1", "true", "yes")
+        )
     
-    def _parse_extraction_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse AI response into structured data"""
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the HTTP session lazily so it binds to the running event loop"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=MAX_CONNECTIONS,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                    ttl_dns_cache=300
+                ),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT),
+                headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+            )
+        return self._session
+    
+    async def close(self) -> None:
+        """Close the HTTP session and its pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def warm_up(self) -> None:
+        """Open a connection to the API ahead of the first RFQ so DNS and TLS setup are already done"""
+        if not self.health_check():
+            return
         try:
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                return json.loads(json_str)
+            async with self._get_session().get(OPENAI_MODELS_URL) as response:
+                await response.read()
+            logger.info("AI extractor connection warmed up")
+        except Exception as e:
+            logger.warning(f"AI extractor warm-up failed: {str(e)}")
+        
+    def health_check(self) -> bool:
+        """Check if AI service is available"""
+        try:
+            return bool(os.getenv("OPENAI_API_KEY"))
+        except:
+            return False
+    
+    async def extract_rfq_content(self, document_content: str, options: Dict[str, Any] = {}) -> Dict[str, Any]:
+        """Extract structured content from RFQ document using AI"""
+        async for event, payload in self.stream_rfq_content(document_content, options):
+            if event == "complete":
+                return payload
+    
+    async def stream_rfq_content(self, document_content: str, options: Dict[str, Any] = {}) -> AsyncIterator[Tuple[str, Any]]:
+        """Extract RFQ content, yielding ("section", (name, content)) as each section completes and ("complete", result) last"""
+        try:
+            cache_key = self._cache_key(document_content, options)
+            cached = await self._get_cached(cache_key)
+            if cached is not None:
+                logger.info("AI extraction served from cache")
             else:
-                return self._manual_parse_response(response_text)
-                
-        except json.JSONDecodeError:
-            logger.warning("Failed to parse JSON response, using fallback")
-            return self._manual_parse_response(response_text)
-    
-    def _manual_parse_response(self, response_text: str) -> Dict[str, Any]:
-        """Fallback manual parsing"""
-        return {
-            "project_overview": "AI extraction completed but formatting failed",
-            "scope_of_work": response_text[:500] + "...",
-            "deliverables": "Not specified",
-            "timeline": "Not specified", 
-            "location": "Not specified",
-            "submission_requirements": "Not specified",
-            "technical_requirements": "Not specified",
-            "qualifications": "Not specified",
-            "evaluation_criteria": "Not specified",
-            "extracted_sections": ["raw_content"],
-            "confidence_score": 0.5
+                namespace = self._semantic_namespace(options)
+                embedding = await self._semantic_cache.embed(document_content)
+                cached = await self._semantic_cache.lookup(embedding, namespace)
+                if cached is not None:
+                    logger.info("AI extraction served from semantic cache")
+                    await self._store_cached(cache_key, cached)
+            
+            if cached is not None:
+                for section in EXTRACTION_SECTIONS:
+                    yield "section", (section, cached.get(section, "Not specified"))
+                yield "complete", cached
+                return
+            
+            tasks = [
+                asyncio.ensure_future(self._extract_section(document_content, section, options))
+                for section in EXTRACTION_SECTIONS
+            ]
+            section_results = []
+            try:
+                for next_result in asyncio.as_completed(tasks):
+                    section, parsed = await next_result
+                    section_results.append((section, parsed))
+                    yield "section", (section, self._section_value(section, parsed))
+            finally:
+                for task in tasks:
+                    task.cancel()
+            
+            failed_sections = [section for section, parsed in section_results if parsed is None]
+            if failed_sections:
+                logger.warning(f"AI extraction failed for sections: {', '.join(failed_sections)}")
+            
+            section_results.sort(key=lambda result: EXTRACTION_SECTIONS.index(result[0]))
+            extracted_content = self._merge_section_results(section_results)
+            if not failed_sections:
+                await self._store_cached(cache_key, extracted_content)
+                await self._semantic_cache.add(embedding, namespace, extracted_content)
+            
+            logger.info("AI extraction completed successfully")
+            yield "complete", extracted_content
+            
+        except Exception as e:
+            logger.error(f"AI extraction failed: {str(e)}")
+            raise Exception(f"AI extraction failed: {str(e)}")
+    
+    async def extract_batch(self, documents: List[str], options: Dict[str, Any] = {}, batch_size: int = DEFAULT_BATCH_SIZE) -> List[Optional[Dict[str, Any]]]:
+        """Extract several RFQ documents, packing them into shared API calls; failed documents are returned as None"""
+        try:
+            results: List[Optional[Dict[str, Any]]] = [None] * len(documents)
+            cache_keys = [self._cache_key(document, options) for document in documents]
+            
+            pending = []
+            for index, cache_key in enumerate(cache_keys):
+                results[index] = await self._get_cached(cache_key)
+                if results[index] is None:
+                    pending.append(index)
+            
+            chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+            chunk_results = await asyncio.gather(*(
+                self._extract_chunk([documents[index] for index in chunk], options) for chunk in chunks
+            ))
+            
+            for chunk, extracted_list in zip(chunks, chunk_results):
+                for index, extracted_content in zip(chunk, extracted_list):
+                    results[index] = extracted_content
+                    if extracted_content is not None:
+                        await self._store_cached(cache_keys[index], extracted_content)
+            
+            logger.info(f"AI batch extraction completed: {len(documents)} documents, {len(chunks)} API calls")
+            return results
+            
+        except Exception as e:
+            logger.error(f"AI batch extraction failed: {str(e)}")
+            raise Exception(f"AI batch extraction failed: {str(e)}")
+    
+    async def _extract_chunk(self, documents: List[str], options: Dict[str, Any]) -> List[Optional[Dict[str, Any]]]:
+        """Extract a group of documents with a single API call"""
+        system_prompt = self._build_batch_system_prompt(options)
+        prompt = "\n---\n".join(
+            f"DOC_{number}:\n{self._build_extraction_prompt(document, options)}"
+            for number, document in enumerate(documents, start=1)
+        )
+        
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        
+        max_tokens = min(BATCH_TOKENS_PER_DOCUMENT * len(documents), MAX_OUTPUT_TOKENS)
+        extracted_text, finish_reason = await self._chat_completion(messages, max_tokens=max_tokens)
+        if finish_reason == "length":
+            logger.warning(f"Batch reply for {len(documents)} documents was truncated at {max_tokens} tokens")
+            return [None] * len(documents)
+        return self._parse_batch_response(extracted_text, len(documents))
+    
+    async def _extract_section(self, document_content: str, section: str, options: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Extract a single section, returning None for the parsed result if the reply was truncated or invalid"""
+        messages = [
+            {"role": "system", "content": self._build_section_system_prompt(options)},
+            {"role": "user", "content": self._build_extraction_prompt(document_content, options)},
+            {"role": "user", "content": self._build_section_prompt(section)}
+        ]
+        
+        max_tokens = _SECTION_TOKEN_BUDGETS[section]
+        extracted_text, finish_reason = await self._chat_completion(messages, max_tokens=max_tokens)
+        if finish_reason == "length":
+            logger.warning(f"Section {section} reply was truncated at {max_tokens} tokens")
+            return section, None
+        return section, self._parse_json_object(extracted_text)
+    
+    async def _chat_completion(self, messages: List[Dict[str, str]], max_tokens: int) -> Tuple[Optional[str], str]:
+        """Send a chat completion request and return the message content and finish reason"""
+        payload = {
+            "model": EXTRACTION_MODEL,
+            "messages": messages,
+            "temperature": 0.1,
+            "max_tokens": max_tokens,
+            "response_format": {"type": "json_object"}
         }
+        
+        # Generation time grows with max_tokens, so the overall limit does too
+        timeout = aiohttp.ClientTimeout(
+            total=REQUEST_TIMEOUT + max_tokens / MIN_TOKENS_PER_SECOND,
+            sock_connect=CONNECT_TIMEOUT
+        )
+        
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                async with self._limiter:
+                    async with self._get_session().post(OPENAI_CHAT_COMPLETIONS_URL, json=payload, timeout=timeout) as response:
+                        response.raise_for_status()
+                        data = await response.json()
+                choice = data["choices"][0]
+                return choice["message"]["content"], choice.get("finish_reason")
+                
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == MAX_ATTEMPTS - 1 or not self._is_retryable(e, max_tokens):
+                    raise
+                delay = 2 ** attempt + random.random()
+                logger.warning(f"OpenAI request failed ({e!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    
+    def _is_retryable(self, error: Exception, max_tokens: int) -> bool:
+        """Check whether a failed request is worth retrying; timed-out long generations are not"""
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in RETRYABLE_STATUS_CODES
+        if isinstance(error, asyncio.TimeoutError):
+            return max_tokens <= TIMEOUT_RETRY_MAX_TOKENS
+        return isinstance(error, aiohttp.ClientConnectionError)
+    
+    def _cache_key(self, content: str, options: Dict[str, Any]) -> str:
+        """Build the response cache key from content, options and model"""
+        key_material = content.encode() + json.dumps(options, sort_keys=True).encode() + EXTRACTION_MODEL.encode()
+        return hashlib.sha256(key_material).hexdigest()
+    
+    def _semantic_namespace(self, options: Dict[str, Any]) -> str:
+        """Build the semantic cache namespace so only matching options and model share results"""
+        return json.dumps(options, sort_keys=True) + EXTRACTION_MODEL
+    
+    async def _get_cached(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached extraction if it has not expired"""
+        async with self._cache_lock:
+            entry = self._resp_cache.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if time.time() - stored_at >= self._cache_ttl:
+                del self._resp_cache[key]
+                return None
+            self._resp_cache.move_to_end(key)
+            return dict(result)
+    
+    async def _store_cached(self, key: str, result: Dict[str, Any]) -> None:
+        """Store an extraction, evicting the least recently used entries"""
+        async with self._cache_lock:
+            self._resp_cache[key] = (time.time(), dict(result))
+            self._resp_cache.move_to_end(key)
+            while len(self._resp_cache) > self._cache_max_entries:
+                self._resp_cache.popitem(last=False)
+    
+    def _build_section_system_prompt(self, options: Dict[str, Any]) -> str:
+        """Return the static instructions for single-section requests, without the full JSON schema"""
+        return _SECTION_SYSTEM_PROMPT
+    
+    def _build_batch_system_prompt(self, options: Dict[str, Any]) -> str:
+        """Return the extraction instructions used when several documents share one request"""
+        return _BATCH_SYSTEM_PROMPT
+    
+    def _build_extraction_prompt(self, content: str, options: Dict[str, Any]) -> str:
+        """Build the prompt for AI extraction"""
+        return _PROMPT_PREFIX + content
+    
+    def _build_section_prompt(self, section: str) -> str:
+        """Return the follow-up instruction that narrows extraction to one section"""
+        return _SECTION_PROMPTS[section]
+    
+    def _parse_json_object(self, response_text: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Parse a JSON object reply, returning None for invalid or missing (refused, filtered) content"""
+        try:
+            parsed = json.loads(response_text)
+        except (json.JSONDecodeError, TypeError):
+            logger.warning("Failed to parse JSON response")
+            return None
+        return parsed if isinstance(parsed, dict) else None
+    
+    def _section_value(self, section: str, parsed: Optional[Dict[str, Any]]) -> str:
+        """Return a section's extracted text, or "Not specified" if it is missing or failed"""
+        value = parsed.get(section) if parsed is not None else None
+        return value if isinstance(value, str) and value.strip() else "Not specified"
+    
+    def _merge_section_results(self, section_results: List[Tuple[str, Optional[Dict[str, Any]]]]) -> Dict[str, Any]:
+        """Assemble per-section responses into the full extraction result"""
+        extracted_content: Dict[str, Any] = {}
+        confidence_scores = []
+        
+        for section, parsed in section_results:
+            extracted_content[section] = self._section_value(section, parsed)
+            try:
+                confidence_scores.append(float(parsed.get("confidence_score", 0.5)) if parsed is not None else 0.0)
+            except (TypeError, ValueError):
+                confidence_scores.append(0.5)
+        
+        extracted_content["extracted_sections"] = [
+            section for section in EXTRACTION_SECTIONS if extracted_content[section] != "Not specified"
+        ]
+        extracted_content["confidence_score"] = round(sum(confidence_scores) / len(confidence_scores), 2)
+        return extracted_content
+    
+    def _parse_batch_response(self, response_text: str, document_count: int) -> List[Optional[Dict[str, Any]]]:
+        """Parse a batched AI response into one structured result per document, using None for missing entries"""
+        parsed = self._parse_json_object(response_text) or {}
+        entries = parsed.get("results") if isinstance(parsed.get("results"), list) else []
+        if len(entries) != document_count:
+            logger.warning(f"Batch response returned {len(entries)} results for {document_count} documents")
+        
+        return [
+            self._normalize_batch_entry(entries[index]) if index < len(entries) else None
+            for index in range(document_count)
+        ]
+    
+    def _normalize_batch_entry(self, entry: Any) -> Optional[Dict[str, Any]]:
+        """Return a batch entry in the section-result shape, or None unless every section is present"""
+        if not isinstance(entry, dict) or not all(isinstance(entry.get(section), str) for section in EXTRACTION_SECTIONS):
+            return None
+        return self._merge_section_results([(section, entry) for section in EXTRACTION_SECTIONS])
@@ -1,6 +1,7 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from quart import Quart, request, jsonify, make_response
+from quart_cors import cors
 import asyncio
+import json
 import os
 import logging
 from datetime import datetime
@@ -9,22 +10,31 @@ from ai_extractor import AIExtractor
 from redactor import ContentRedactor
 from rfq_generator import RFQGenerator
 
-app = Flask(__name__)
-CORS(app)
+app = cors(Quart(__name__))
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MAX_BATCH_DOCUMENTS = 10
+
 ai_extractor = AIExtractor()
 redactor = ContentRedactor()
 rfq_generator = RFQGenerator()
 
+@app.before_serving
+async def warm_up():
+    await ai_extractor.warm_up()
+
+@app.after_serving
+async def close_sessions():
+    await ai_extractor.close()
+
 @app.route('/')
-def home():
+async def home():
     return "<h1>🚀 RFQ Rocket Backend</h1><p>Server is running!</p>"
 
 @app.route('/api/health', methods=['GET'])
-def health_check():
+async def health_check():
     try:
         api_key_ok = ai_extractor.health_check()
         return jsonify({
@@ -35,20 +45,85 @@ def health_check():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/api/process-rfq', methods=['POST'])
-def process_rfq():
+async def process_rfq():
     try:
-        data = request.get_json()
+        data = await request.get_json()
         if not data or 'content' not in data:
             return jsonify({'success': False, 'error': 'No content'}), 400
+        if not isinstance(data['content'], str):
+            return jsonify({'success': False, 'error': 'Content must be a string'}), 400
         
-        result = asyncio.run(process_document(data['content'], data.get('company_info', {})))
+        result = await process_document(data['content'], data.get('company_info', {}))
         return jsonify(result)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/process-rfq/stream', methods=['POST'])
+async def process_rfq_stream():
+    data = await request.get_json()
+    if not data or 'content' not in data:
+        return jsonify({'success': False, 'error': 'No content'}), 400
+    if not isinstance(data['content'], str):
+        return jsonify({'success': False, 'error': 'Content must be a string'}), 400
+    
+    async def generate():
+        try:
+            async for name, payload in process_document_stream(data['content'], data.get('company_info', {})):
+                yield f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'success': False, 'error': str(e)})}\n\n"
+    
+    response = await make_response(generate(), {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+    response.timeout = None
+    return response
+
+@app.route('/api/process-rfqs', methods=['POST'])
+async def process_rfqs():
+    try:
+        data = await request.get_json()
+        if not data or not isinstance(data.get('documents'), list) or not data['documents']:
+            return jsonify({'success': False, 'error': 'No documents'}), 400
+        if not all(isinstance(document, str) for document in data['documents']):
+            return jsonify({'success': False, 'error': 'Documents must be strings'}), 400
+        if len(data['documents']) > MAX_BATCH_DOCUMENTS:
+            return jsonify({'success': False, 'error': f'At most {MAX_BATCH_DOCUMENTS} documents per request'}), 400
+        
+        results = await process_documents(data['documents'], data.get('company_info', {}))
+        return jsonify({'success': True, 'results': results})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 async def process_document(content: str, company_info: dict):
-    extracted = await ai_extractor.extract_rfq_content(content)
+    prefiltered, prefilter_summary = await redactor.strip_boilerplate_and_redact(content)
+    extracted = await ai_extractor.extract_rfq_content(prefiltered)
+    return await build_result(extracted, prefilter_summary, company_info)
+
+async def process_document_stream(content: str, company_info: dict):
+    prefiltered, prefilter_summary = await redactor.strip_boilerplate_and_redact(content)
+    async for event, payload in ai_extractor.stream_rfq_content(prefiltered):
+        if event == 'section':
+            section, section_content = payload
+            yield 'section', {'section': section, 'content': section_content}
+        else:
+            extracted = payload
+    
+    yield 'result', await build_result(extracted, prefilter_summary, company_info)
+
+async def process_documents(contents: list, company_info: dict):
+    prefiltered_list = await asyncio.gather(*(redactor.strip_boilerplate_and_redact(content) for content in contents))
+    extracted_list = await ai_extractor.extract_batch([prefiltered for prefiltered, _ in prefiltered_list])
+    return await asyncio.gather(*(
+        build_result(extracted, prefilter_summary, company_info) if extracted is not None
+        else failed_result('AI extraction failed for this document')
+        for extracted, (_, prefilter_summary) in zip(extracted_list, prefiltered_list)
+    ))
+
+async def failed_result(error: str):
+    return {'success': False, 'error': error}
+
+async def build_result(extracted: dict, prefilter_summary: list, company_info: dict):
     redacted, summary = await redactor.redact_content(extracted)
+    summary = prefilter_summary + summary
     final_rfq = await rfq_generator.generate_rfq(redacted, company_info)
     
     return {
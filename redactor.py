@@ -1,20 +1,57 @@
 import re
 import asyncio
+import string
+import threading
+import time
 from typing import Dict, Any, List, Tuple
-from datetime import datetime
 import logging
 
+import ahocorasick
+
+try:
+    import hyperscan
+except ImportError:  # hyperscan wheels are only published for some platforms
+    hyperscan = None
+
 logger = logging.getLogger(__name__)
 
+# Lowercases ASCII only, so offsets in the lowered text match the original text
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
 class ContentRedactor:
     def __init__(self):
-        self.redaction_patterns = self._init_redaction_patterns()
+        self.redaction_keywords = self._init_redaction_keywords()
+        patterns = self._init_redaction_patterns()
+        self.pattern_categories = [category for category, category_patterns in patterns.items() for _ in category_patterns]
+        
+        if hyperscan is not None:
+            self.redaction_database = self._compile_hyperscan_database(patterns)
+            self.redaction_patterns = {}
+            self._scratch = threading.local()
+        else:
+            self.redaction_database = None
+            self.redaction_patterns = self._compile_regex_patterns(patterns)
+        
+        self.boilerplate_patterns = self._init_boilerplate_patterns()
+        self.document_patterns = self._init_document_patterns()
+    
+    def _init_redaction_keywords(self) -> ahocorasick.Automaton:
+        """Initialize the Aho-Corasick automaton for literal keywords"""
+        keywords = {
+            "government_agencies": ["VA", "GSA", "DOD", "DHS", "USACE", "NAVY", "ARMY", "AIR FORCE", "MARINES"]
+        }
+        
+        automaton = ahocorasick.Automaton()
+        for category, category_keywords in keywords.items():
+            for keyword in category_keywords:
+                automaton.add_word(keyword.lower(), (category, len(keyword)))
+        automaton.make_automaton()
+        return automaton
     
     def _init_redaction_patterns(self) -> Dict[str, List[str]]:
         """Initialize regex patterns for redaction"""
         return {
             "government_agencies": [
-                r'\b(VA|GSA|DOD|DHS|USACE|NAVY|ARMY|AIR FORCE|MARINES)\b',
                 r'\b(Department of [A-Za-z\s]+)\b',
                 r'\b(U\.S\. [A-Za-z\s]+ Administration)\b',
                 r'\b([A-Z]{2,5} Command)\b'
@@ -40,20 +77,106 @@ class ContentRedactor:
             ]
         }
     
+    def _compile_hyperscan_database(self, patterns: Dict[str, List[str]]) -> "hyperscan.Database":
+        """Compile every redaction pattern into a single Hyperscan database"""
+        expressions = [pattern.encode() for category_patterns in patterns.values() for pattern in category_patterns]
+        flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST | hyperscan.HS_FLAG_UTF8
+        
+        database = hyperscan.Database()
+        database.compile(
+            expressions=expressions,
+            ids=list(range(len(expressions))),
+            elements=len(expressions),
+            flags=[flags] * len(expressions)
+        )
+        return database
+    
+    def _compile_regex_patterns(self, patterns: Dict[str, List[str]]) -> Dict[str, re.Pattern]:
+        """Compile regex patterns once per category, used when Hyperscan is unavailable"""
+        return {
+            category: re.compile("|".join(f"(?:{p})" for p in category_patterns), re.IGNORECASE)
+            for category, category_patterns in patterns.items()
+        }
+    
+    def _init_boilerplate_patterns(self) -> List[re.Pattern]:
+        """Initialize patterns for cover-page, header/footer and FAR clause boilerplate"""
+        patterns = [
+            r'^[ \t]*(?:DFARS[ \t]+|FAR[ \t]+)?(?:52|252)\.\d{3}-\d{1,4}\b(?:(?!\n[ \t]*(?:DFARS[ \t]+|FAR[ \t]+)?(?:52|252)\.\d{3}-\d).)*?\(End of (?:clause|provision)\)[^\n]*\n?',
+            r'^[ \t]*(?:DFARS[ \t]+|FAR[ \t]+)?(?:52|252)\.\d{3}-\d{1,4}\b[^\n]*\([A-Z]{3,4}\.?[ \t]+\d{4}\)[ \t]*$\n?',
+            r'^[ \t]*Page[ \t]+\d+(?:[ \t]+of[ \t]+\d+)?[ \t]*$\n?',
+            r'^[ \t]*(?:STANDARD[ \t]+FORM|SF)[ \t]*\d{2,4}(?:[ \t]*\(REV\.?[ \t]*[\d/.-]+\)[^\n]*)?[ \t]*$\n?',
+            r'^[ \t]*Prescribed[ \t]+by[ \t]+GSA[^\n]*CFR[^\n]*$\n?',
+            r'^[ \t]*(?:THIS[ \t]+PAGE[ \t]+(?:IS[ \t]+)?)?INTENTIONALLY[ \t]+(?:LEFT[ \t]+)?BLANK\.?[ \t]*$\n?'
+        ]
+        
+        return [re.compile(pattern, re.IGNORECASE | re.MULTILINE | re.DOTALL) for pattern in patterns]
+    
+    def _init_document_patterns(self) -> Dict[str, re.Pattern]:
+        """Initialize the patterns that are safe to run over a whole raw document"""
+        # Unlike the section patterns these never span lines ([^\S\n] instead of \s), only the
+        # keywords are case-insensitive, and codes must be followed by an actual ID
+        patterns = {
+            "contact_info": [
+                r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b',
+                r'(?<![\d-])(?:\(\d{3}\)[^\S\n]?|\b\d{3}[-.])\d{3}[-.]\d{4}\b',
+                r'\bhttps?://[^\s]+\b',
+                r'\bwww\.[^\s]+\b'
+            ],
+            "federal_codes": [
+                r'\b(?i:DUNS)(?:[^\S\n]*(?i:no\.?|number|#))?[^\S\n]*:?[^\S\n]*\d{9}\b',
+                r'\b(?i:UEI)(?:[^\S\n]*(?i:no\.?|number|#))?[^\S\n]*:?[^\S\n]*[A-Z0-9]{12}\b',
+                r'\b(?i:CAGE)(?:[^\S\n]+(?i:code))?[^\S\n]*:?[^\S\n]*[A-Z0-9]{5}\b',
+                r'\b(?i:solicitation|contract)(?:[^\S\n]+(?i:no\.?|number|#))?[^\S\n]*:?[^\S\n]*'
+                r'(?=[A-Z0-9-]*\d)(?=[A-Z0-9-]{6})[A-Z0-9]+(?:-[A-Z0-9]+)*\b'
+            ],
+            "specific_locations": [
+                r'\b\d+[^\S\n]+[A-Za-z]+(?:[^\S\n]+[A-Za-z]+){0,3}[^\S\n]+'
+                r'(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Boulevard|Blvd)\b\.?',
+                r'\b(?i:building|bldg\.?)[^\S\n]*\d+\b'
+            ]
+        }
+        
+        return {
+            category: re.compile("|".join(f"(?:{p})" for p in category_patterns))
+            for category, category_patterns in patterns.items()
+        }
+    
+    async def strip_boilerplate_and_redact(self, text: str) -> Tuple[str, List[str]]:
+        """Strip boilerplate and redact sensitive information from a raw document before AI extraction"""
+        try:
+            stripped_text, removed_blocks = await asyncio.to_thread(self._strip_boilerplate, text)
+            redacted_text, redactions = await asyncio.to_thread(self._redact_with_regex, stripped_text, self.document_patterns)
+            
+            redaction_summary = [f"document: {r}" for r in redactions]
+            if removed_blocks:
+                redaction_summary.insert(0, f"document: Removed boilerplate: {removed_blocks} blocks")
+            
+            logger.info(f"Document pre-filter removed {len(text) - len(redacted_text)} characters")
+            return redacted_text, redaction_summary
+            
+        except Exception as e:
+            logger.error(f"Document pre-filter failed: {str(e)}")
+            raise Exception(f"Document pre-filter failed: {str(e)}")
+    
     async def redact_content(self, content: Dict[str, Any], options: Dict[str, str] = {}) -> Tuple[Dict[str, Any], List[str]]:
         """Redact sensitive information from extracted content"""
         try:
-            redacted_content = content.copy()
-            redaction_summary = []
+            text_keys = [key for key, value in content.items() if isinstance(value, str)]
+            results = await asyncio.gather(*(asyncio.to_thread(self._redact_text, content[key]) for key in text_keys))
+            redacted_sections = dict(zip(text_keys, results))
             
-            for section_key, section_content in redacted_content.items():
-                if isinstance(section_content, str):
-                    redacted_text, section_redactions = self._redact_text(section_content)
+            redacted_content: Dict[str, Any] = {}
+            redaction_summary = []
+            for section_key, section_content in content.items():
+                if section_key in redacted_sections:
+                    redacted_text, section_redactions = redacted_sections[section_key]
                     redacted_content[section_key] = redacted_text
                     redaction_summary.extend([f"{section_key}: {r}" for r in section_redactions])
+                else:
+                    redacted_content[section_key] = section_content
             
             redacted_content["redaction_applied"] = True
-            redacted_content["redaction_timestamp"] = datetime.utcnow().isoformat()
+            redacted_content["redaction_timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
             
             logger.info(f"Content redaction completed. {len(redaction_summary)} items redacted")
             return redacted_content, redaction_summary
@@ -64,14 +187,95 @@ class ContentRedactor:
     
     def _redact_text(self, text: str) -> Tuple[str, List[str]]:
         """Redact sensitive information from text"""
+        redacted_text, redactions = self._redact_keywords(text)
+        
+        if self.redaction_database is not None:
+            redacted_text, pattern_redactions = self._redact_with_hyperscan(redacted_text)
+        else:
+            redacted_text, pattern_redactions = self._redact_with_regex(redacted_text, self.redaction_patterns)
+        
+        return redacted_text, redactions + pattern_redactions
+    
+    def _strip_boilerplate(self, text: str) -> Tuple[str, int]:
+        """Remove boilerplate blocks and collapse the blank lines they leave behind"""
+        removed_blocks = 0
+        for pattern in self.boilerplate_patterns:
+            text, count = pattern.subn("", text)
+            removed_blocks += count
+        
+        return re.sub(r'\n{3,}', "\n\n", text), removed_blocks
+    
+    def _redact_keywords(self, text: str) -> Tuple[str, List[str]]:
+        """Redact literal keywords in a single Aho-Corasick pass"""
+        lowered = text.translate(_ASCII_LOWER)
+        spans = []
+        for end_index, (category, length) in self.redaction_keywords.iter(lowered):
+            start, end = end_index - length + 1, end_index + 1
+            if self._is_word_boundary(text, start) and self._is_word_boundary(text, end):
+                spans.append((start, end, category))
+        
+        return self._splice_redactions(text, spans)
+    
+    def _redact_with_hyperscan(self, text: str) -> Tuple[str, List[str]]:
+        """Redact all regex patterns in a single Hyperscan pass"""
+        data = text.encode()
+        spans = []
+        
+        def collect_span(pattern_id: int, start: int, end: int, flags: int, context: Any) -> None:
+            spans.append((start, end, self.pattern_categories[pattern_id]))
+        
+        self.redaction_database.scan(data, match_event_handler=collect_span, scratch=self._get_scratch())
+        redacted_data, redactions = self._splice_redactions(data, spans)
+        return redacted_data.decode(), redactions
+    
+    def _redact_with_regex(self, text: str, patterns: Dict[str, re.Pattern]) -> Tuple[str, List[str]]:
+        """Redact regex patterns with one pass per category"""
         redacted_text = text
         redactions = []
         
-        for category, patterns in self.redaction_patterns.items():
-            for pattern in patterns:
-                matches = re.findall(pattern, redacted_text, re.IGNORECASE)
-                if matches:
-                    redacted_text = re.sub(pattern, "[REDACTED]", redacted_text, flags=re.IGNORECASE)
-                    redactions.extend([f"Removed {category}: {match}" for match in matches])
+        for category, pattern in patterns.items():
+            def record_and_redact(match: re.Match, category: str = category) -> str:
+                redactions.append(f"Removed {category}: {match.group(0)}")
+                return "[REDACTED]"
+            
+            redacted_text, _ = pattern.subn(record_and_redact, redacted_text)
         
         return redacted_text, redactions
+    
+    def _get_scratch(self) -> "hyperscan.Scratch":
+        """Return this thread's Hyperscan scratch space, since scratch cannot be shared across threads"""
+        scratch = getattr(self._scratch, "scratch", None)
+        if scratch is None:
+            scratch = self._scratch.scratch = hyperscan.Scratch(self.redaction_database)
+        return scratch
+    
+    def _splice_redactions(self, text, spans: List[Tuple[int, int, str]]):
+        """Replace matched spans with the redaction marker, merging overlaps"""
+        is_bytes = isinstance(text, bytes)
+        marker = b"[REDACTED]" if is_bytes else "[REDACTED]"
+        
+        merged = []
+        for start, end, category in sorted(spans, key=lambda span: (span[0], -span[1])):
+            if merged and start < merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end, category])
+        
+        pieces = []
+        redactions = []
+        position = 0
+        for start, end, category in merged:
+            removed = text[start:end]
+            pieces.append(text[position:start])
+            pieces.append(marker)
+            redactions.append(f"Removed {category}: {removed.decode() if is_bytes else removed}")
+            position = end
+        pieces.append(text[position:])
+        
+        return text[:0].join(pieces), redactions
+    
+    def _is_word_boundary(self, text: str, index: int) -> bool:
+        """Check for a regex-style word boundary just before index"""
+        before = index > 0 and (text[index - 1].isalnum() or text[index - 1] == "_")
+        after = index < len(text) and (text[index].isalnum() or text[index] == "_")
+        return before != after
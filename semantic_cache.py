@@ -0,0 +1,125 @@
+import asyncio
+import json
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
+import logging
+
+try:
+    import numpy as np
+    import faiss
+    from fastembed import TextEmbedding
+except ImportError:  # semantic caching is optional, see requirements-semantic-cache.txt
+    np = faiss = TextEmbedding = None
+
+logger = logging.getLogger(__name__)
+
+# Each server worker loads its own model and keeps its own in-memory index. The SQLite
+# table is only read at startup, so entries added by one worker are not seen by the
+# others until they restart.
+class SemanticCache:
+    def __init__(self, model_name: str = "BAAI/bge-small-en", threshold: float = 0.95,
+                 db_path: Optional[str] = None, max_chars: int = 8000, search_k: int = 5,
+                 enabled: bool = True):
+        self.enabled = enabled and TextEmbedding is not None
+        self._threshold = threshold
+        self._max_chars = max_chars
+        self._search_k = search_k
+        self._index = None
+        self._entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        
+        if not enabled:
+            logger.info("Semantic cache disabled")
+            return
+        if TextEmbedding is None:
+            logger.info("Semantic cache disabled: fastembed/faiss not installed")
+            return
+        
+        try:
+            self._model = TextEmbedding(model_name)
+            if db_path:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS semantic_cache "
+                    "(id INTEGER PRIMARY KEY, namespace TEXT, embedding BLOB, result TEXT)"
+                )
+                self._load_from_db()
+        except Exception as e:
+            logger.error(f"Semantic cache disabled: initialization failed: {str(e)}")
+            self.enabled = False
+            self._index = None
+            self._entries = []
+            self._db = None
+    
+    async def embed(self, content: str) -> Optional[Any]:
+        """Embed document content, or return None when the cache is disabled or embedding fails"""
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._embed, content)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {str(e)}")
+            return None
+    
+    async def lookup(self, embedding: Optional[Any], namespace: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the closest cached result above the similarity threshold"""
+        if embedding is None:
+            return None
+        try:
+            return await asyncio.to_thread(self._lookup, embedding, namespace)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {str(e)}")
+            return None
+    
+    async def add(self, embedding: Optional[Any], namespace: str, result: Dict[str, Any]) -> None:
+        """Store a result under its document embedding"""
+        if embedding is None:
+            return
+        try:
+            await asyncio.to_thread(self._add, embedding, namespace, result)
+        except Exception as e:
+            logger.warning(f"Semantic cache add failed: {str(e)}")
+    
+    def _embed(self, content: str) -> Any:
+        """Compute a normalized embedding for the leading part of the document"""
+        embedding = np.asarray(next(iter(self._model.embed([content[:self._max_chars]]))), dtype="float32")
+        return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+    
+    def _lookup(self, embedding: Any, namespace: str) -> Optional[Dict[str, Any]]:
+        """Search the index for a match in the same namespace"""
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                return None
+            scores, ids = self._index.search(embedding.reshape(1, -1), min(self._search_k, self._index.ntotal))
+            for score, entry_id in zip(scores[0], ids[0]):
+                if score < self._threshold:
+                    break
+                entry = self._entries[entry_id]
+                if entry["namespace"] == namespace:
+                    logger.info(f"Semantic cache hit (similarity {score:.3f})")
+                    return dict(entry["result"])
+        return None
+    
+    def _add(self, embedding: Any, namespace: str, result: Dict[str, Any], persist: bool = True) -> None:
+        """Add an embedding to the index and optionally persist it"""
+        with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexFlatIP(embedding.shape[0])
+            self._index.add(embedding.reshape(1, -1))
+            self._entries.append({"namespace": namespace, "result": dict(result)})
+            
+            if persist and self._db is not None:
+                self._db.execute(
+                    "INSERT INTO semantic_cache (namespace, embedding, result) VALUES (?, ?, ?)",
+                    (namespace, embedding.tobytes(), json.dumps(result))
+                )
+                self._db.commit()
+    
+    def _load_from_db(self) -> None:
+        """Rebuild the in-memory index from persisted entries"""
+        rows = self._db.execute("SELECT namespace, embedding, result FROM semantic_cache ORDER BY id").fetchall()
+        for namespace, embedding, result in rows:
+            self._add(np.frombuffer(embedding, dtype="float32"), namespace, json.loads(result), persist=False)
+        logger.info(f"Semantic cache loaded {len(rows)} entries")